@@ -0,0 +1,440 @@
+import argparse
+import itertools
+import json
+from collections import deque
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from csv_parser import load_csv_data, merge_with_ocr
+from image_processor import preprocess_image, needs_tiling
+from ocr_extractor import OCR_BACKENDS, DEFAULT_BACKEND, get_ocr_engine, run_ocr, run_ocr_tiled
+from text_processor import process_ocr_text, merge_with_boxes
+from box_bounder import group_boxes_into_columns
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.webp'}
+
+# Nested pipeline outputs are stored as JSON strings in Parquet files
+PARQUET_JSON_COLUMNS = ["ocr_texts", "ocr_boxes", "ocr_scores", "primary_staged_json",
+                        "secondary_staged_json", "final_refined_json"]
+# Column types for every Parquet part, so parts with all-empty columns still share one schema
+PARQUET_COLUMN_TYPES = dict({"image": "string", "csv": "string", "seconds": "float64"},
+                            **{col: "string" for col in PARQUET_JSON_COLUMNS})
+
+# Images kept in flight per worker, so results stream instead of piling up in the parent
+JOBS_IN_FLIGHT_PER_WORKER = 2
+
+# --- Input discovery ---
+def collect_jobs(input_dir=None, manifest=None):
+    """
+    Returns a list of (image_path, csv_path) jobs.
+    input_dir: walked recursively for images (no CSV data).
+    manifest: text file with one "image_path[,csv_path]" entry per line.
+    """
+    jobs = []
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = [p.strip() for p in line.split(",", 1)]
+                image_path = os.path.abspath(os.path.join(base_dir, parts[0]))
+                csv_path = os.path.abspath(os.path.join(base_dir, parts[1])) if len(parts) > 1 and parts[1] else None
+                jobs.append((image_path, csv_path))
+    else:
+        for root, _, files in os.walk(input_dir):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    jobs.append((os.path.abspath(os.path.join(root, name)), None))
+        jobs.sort()
+    return jobs
+
+# --- Checkpointing ---
+def load_checkpoint(checkpoint_path):
+    """Checkpoint is a plain text file with one completed image path per line."""
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+def append_checkpoint(checkpoint_file, image_paths):
+    for path in image_paths:
+        checkpoint_file.write(path + "\n")
+    checkpoint_file.flush()
+    os.fsync(checkpoint_file.fileno())
+
+def load_failed(failed_path):
+    """Failed list holds one "image_path<TAB>error" line per failed image."""
+    if not os.path.exists(failed_path):
+        return set()
+    with open(failed_path, "r", encoding="utf-8") as f:
+        return {line.split("\t", 1)[0] for line in f if line.strip()}
+
+def append_failed(failed_file, image_path, error):
+    failed_file.write(f"{image_path}\t{error}\n")
+    failed_file.flush()
+    os.fsync(failed_file.fileno())
+
+# --- Worker side ---
+class WorkerInitError(Exception):
+    """The OCR engine could not be loaded in a worker (environment problem, not a bad image)."""
+
+# Set in a worker whose engine failed to load; reported back instead of killing the worker
+_init_error = None
+
+def worker_threads(workers):
+    """CPU threads per worker so that all workers together use each core once."""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def init_worker(backend, threads, verbose=False):
+    global _init_error
+
+    # The pipeline prints every stage's output; keep the parent's progress lines readable
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")
+
+    # Split the cores between workers unless the thread count was set explicitly
+    os.environ.setdefault("OCR_CPU_THREADS", str(threads))
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+
+    # Load the OCR engine once per worker process. A failure here (model download,
+    # missing plugin) must not look like a crash caused by the images it would process.
+    try:
+        get_ocr_engine(backend)
+    except Exception as e:
+        _init_error = f"{type(e).__name__}: {e}"
+
+def check_worker():
+    if _init_error:
+        raise WorkerInitError(_init_error)
+
+def process_image(image_path, csv_path=None, backend=None, use_llm=False, memory_budget_mb=None):
+    """Runs the full label pipeline on one image without writing per-stage JSON files."""
+    start = time.perf_counter()
+
+    # 1. Preprocess image + 2. Run OCR (tiled when the full image would exceed the memory budget)
+    if needs_tiling(image_path, memory_budget_mb=memory_budget_mb):
+        raw_ocr_data = run_ocr_tiled(image_path, backend, memory_budget_mb=memory_budget_mb)
+    else:
+        processed_img = preprocess_image(image_path)
+        raw_ocr_data = run_ocr(processed_img, backend)
+        del processed_img
+    rec_texts = raw_ocr_data['res']['rec_texts']
+    rec_boxes = raw_ocr_data['res']['rec_boxes']
+
+    # 3. Classify Section labels (Bounding Boxes)
+    sectioned_groups = group_boxes_into_columns(rec_boxes, rec_texts, image_path, save=False)
+
+    # 4. Process OCR text
+    processed_text = process_ocr_text("\n".join(rec_texts), image_path, save=False)
+    primary_text = merge_with_boxes(processed_text, sectioned_groups, image_path, save=False)
+
+    # 5. Secondary cleanup using CSV data
+    secondary_cleaned = None
+    if csv_path:
+        csv_data = load_csv_data(csv_path)
+        if csv_data:
+            secondary_cleaned = merge_with_ocr(primary_text, csv_data, image_path, save=False)
+
+    # 6. LLM Refinement (optional, paid API call)
+    final_json = None
+    if use_llm:
+        from llm_refiner import run_gemini_refinement
+        final_json = run_gemini_refinement(processed_text, primary_text, secondary_cleaned, image_path, save=False)
+
+    return {
+        "image": image_path,
+        "csv": csv_path,
+        "ocr_texts": rec_texts,
+        "ocr_boxes": rec_boxes,
+        "ocr_scores": raw_ocr_data['res'].get('rec_scores'),
+        "primary_staged_json": primary_text,
+        "secondary_staged_json": secondary_cleaned,
+        "final_refined_json": final_json,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def run_job(job, backend, use_llm, memory_budget_mb=None):
+    check_worker()
+    image_path, csv_path = job
+    try:
+        return process_image(image_path, csv_path, backend, use_llm, memory_budget_mb), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+# --- Output writers ---
+class JsonlWriter:
+    """Appends one JSON record per line, synced to disk before the image is checkpointed."""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._drop_partial_line()
+        self.f = open(output_path, "a", encoding="utf-8")
+
+    def _drop_partial_line(self):
+        # A run killed mid-write can leave a truncated last line; cut it so appends start on a fresh line
+        if not os.path.exists(self.output_path):
+            return
+        with open(self.output_path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                chunk = f.read(end - start)
+                idx = chunk.rfind(b"\n")
+                if idx != -1:
+                    f.truncate(start + idx + 1)
+                    return
+                end = start
+            f.truncate(0)
+
+    def recorded_images(self):
+        """Images already in the output file (used to reconcile with the checkpoint)."""
+        with open(self.output_path, "r", encoding="utf-8") as f:
+            return {json.loads(line)["image"] for line in f if line.strip()}
+
+    def write(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return [record["image"]]
+
+    def close(self):
+        self.f.close()
+        return []
+
+class ParquetWriter:
+    """Buffers records and writes them as numbered part files inside the output directory."""
+
+    def __init__(self, output_dir, flush_every):
+        import pandas as pd  # only needed for Parquet output
+        self.pd = pd
+        self.output_dir = output_dir
+        self.flush_every = flush_every
+        self.buffer = []
+        os.makedirs(output_dir, exist_ok=True)
+        self.part = len(self._part_files())
+
+    def _part_files(self):
+        return sorted(os.path.join(self.output_dir, f) for f in os.listdir(self.output_dir) if f.endswith(".parquet"))
+
+    def recorded_images(self):
+        """Images already in the part files (used to reconcile with the checkpoint)."""
+        images = set()
+        for path in self._part_files():
+            images.update(self.pd.read_parquet(path, columns=["image"])["image"])
+        return images
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.flush_every:
+            return self.flush()
+        return []
+
+    def flush(self):
+        if not self.buffer:
+            return []
+        rows = []
+        for record in self.buffer:
+            row = dict(record)
+            for col in PARQUET_JSON_COLUMNS:
+                row[col] = json.dumps(row[col], ensure_ascii=False)
+            rows.append(row)
+        part_path = os.path.join(self.output_dir, f"part-{self.part:05d}.parquet")
+        df = self.pd.DataFrame(rows, columns=list(PARQUET_COLUMN_TYPES)).astype(PARQUET_COLUMN_TYPES)
+        # Write under a temporary name so an interrupted write never leaves a half part file behind
+        tmp_path = part_path + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, part_path)
+        self.part += 1
+        written = [r["image"] for r in self.buffer]
+        self.buffer = []
+        return written
+
+    def close(self):
+        return self.flush()
+
+# --- Progress reporting ---
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def print_progress(done, failed, total, started):
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0.0
+    remaining = total - done - failed
+    eta = format_duration(remaining / rate) if rate else "--:--:--"
+    print(f"[{done + failed}/{total}] ok={done} failed={failed} "
+          f"{rate:.2f} img/s elapsed={format_duration(elapsed)} ETA={eta}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable batch OCR over a directory or manifest of label images.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input-dir", help="Directory of label images (walked recursively)")
+    source.add_argument("--manifest", help="Text file with one 'image_path[,csv_path]' per line")
+    parser.add_argument("--output", required=True,
+                        help="Output .jsonl file, or output directory for Parquet part files")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parallel worker processes")
+    parser.add_argument("--backend", choices=list(OCR_BACKENDS), default=None, help="OCR backend (default: OCR_BACKEND)")
+    parser.add_argument("--llm", action="store_true", help="Also run Gemini refinement for each image")
+    parser.add_argument("--memory-budget-mb", type=int, default=None,
+                        help="Peak memory per image before switching to tiled processing (default: OCR_MEMORY_BUDGET_MB)")
+    parser.add_argument("--flush-every", type=int, default=500, help="Records per Parquet part file")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Also process images recorded in <output>.failed by earlier runs")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's per-image output from the workers")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if (args.backend or DEFAULT_BACKEND) not in OCR_BACKENDS:
+        parser.error(f"Unknown OCR backend: {DEFAULT_BACKEND} (OCR_BACKEND, available: {', '.join(OCR_BACKENDS)})")
+
+    jobs = collect_jobs(args.input_dir, args.manifest)
+    output_base = os.path.abspath(args.output).rstrip(os.sep)
+    checkpoint_path = args.checkpoint or output_base + ".checkpoint"
+    failed_path = output_base + ".failed"
+
+    if args.format == "parquet":
+        writer = ParquetWriter(args.output, args.flush_every)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        writer = JsonlWriter(args.output)
+
+    # A run killed between writing a record and checkpointing it: count the record as done
+    completed = load_checkpoint(checkpoint_path)
+    unrecorded = writer.recorded_images() - completed
+    if unrecorded:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint_file:
+            append_checkpoint(checkpoint_file, sorted(unrecorded))
+        completed |= unrecorded
+    previously_failed = set() if args.retry_failed else load_failed(failed_path)
+    pending = [job for job in jobs if job[0] not in completed and job[0] not in previously_failed]
+    skipped = sum(1 for job in jobs if job[0] in previously_failed and job[0] not in completed)
+
+    print(f"Found {len(jobs)} images, {len(jobs) - len(pending) - skipped} already done, "
+          f"{skipped} previously failed (skipped, use --retry-failed), {len(pending)} to process.")
+    if not pending:
+        writer.close()
+        return
+
+    def new_pool():
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                   initargs=(args.backend, worker_threads(args.workers), args.verbose))
+        # Make sure workers start before handing them images, so a broken environment
+        # stops the run instead of getting every image recorded as failed
+        try:
+            pool.submit(check_worker).result()
+        except (BrokenProcessPool, WorkerInitError) as e:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise WorkerInitError(str(e) or "worker process crashed on startup")
+        return pool
+
+    done = failed = 0
+    started = time.perf_counter()
+    checkpoint_file = open(checkpoint_path, "a", encoding="utf-8")
+    failed_file = open(failed_path, "a", encoding="utf-8")
+    remaining = iter(pending)
+    suspects = deque()  # images in flight when a worker crashed, re-run one at a time
+    in_flight = {}
+    executor = None
+    init_error = None
+    try:
+        executor = new_pool()
+        while True:
+            # Keep a bounded window of submitted images (a single one while isolating suspects)
+            submit_failed = False
+            while len(in_flight) < (1 if suspects else JOBS_IN_FLIGHT_PER_WORKER * args.workers):
+                if suspects:
+                    if in_flight:
+                        break
+                    job = suspects.popleft()
+                else:
+                    job = next(remaining, None)
+                if job is None:
+                    break
+                try:
+                    in_flight[executor.submit(run_job, job, args.backend, args.llm, args.memory_budget_mb)] = job
+                except BrokenProcessPool:
+                    # Pool died after its last result was read - requeue the image
+                    remaining = itertools.chain([job], remaining)
+                    submit_failed = True
+                    break
+            if not in_flight:
+                if not submit_failed:
+                    break
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = new_pool()
+                continue
+
+            isolated = len(in_flight) == 1
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            pool_broken = False
+            for future in finished:
+                job = in_flight.pop(future)
+                try:
+                    record, error = future.result()
+                except BrokenProcessPool:
+                    # A worker died (OOM-kill, segfault). Alone in the pool, this image is the cause;
+                    # otherwise it can't be told apart from the others in flight, so re-run it alone.
+                    pool_broken = True
+                    if not isolated:
+                        suspects.append(job)
+                        continue
+                    record, error = None, "worker process crashed"
+
+                if error:
+                    # Failed images are skipped on resume unless --retry-failed is given
+                    failed += 1
+                    append_failed(failed_file, job[0], error)
+                    print(f"Failed: {job[0]} ({error})", file=sys.stderr)
+                else:
+                    done += 1
+                    append_checkpoint(checkpoint_file, writer.write(record))
+                print_progress(done, failed, len(pending), started)
+
+            if pool_broken:
+                # Every image still in flight went down with the pool
+                suspects.extend(in_flight.values())
+                in_flight.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                print("Worker pool crashed - starting a new one.", file=sys.stderr)
+                executor = new_pool()
+    except KeyboardInterrupt:
+        print("\nInterrupted - saving progress. Re-run the same command to resume.", file=sys.stderr)
+    except WorkerInitError as e:
+        init_error = e
+    finally:
+        # Drop queued images on interrupt; everything already written stays checkpointed
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        append_checkpoint(checkpoint_file, writer.close())
+        checkpoint_file.close()
+        failed_file.close()
+
+    if init_error:
+        print(f"\nOCR workers could not start, stopping the run: {init_error}", file=sys.stderr)
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - started
+    print(f"\nProcessed {done} images ({failed} failed) in {format_duration(elapsed)} "
+          f"- {done / elapsed if elapsed else 0.0:.2f} img/s")
+    print(f"Results written to: {os.path.abspath(args.output)}")
+    if failed:
+        print(f"Failed images listed in: {failed_path}")
+
+if __name__ == "__main__":
+    main()
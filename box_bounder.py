@@ -70,7 +70,7 @@ def is_nutrition_fact(text: str) -> bool:
 #     return section_bboxes
 
 # --- Main grouping function ---
-def group_boxes_into_columns(rec_boxes, texts, img_filename, tolerance=5, anchor_tolerance=500):
+def group_boxes_into_columns(rec_boxes, texts, img_filename, tolerance=5, anchor_tolerance=500, save=True):
     """
     Group OCR boxes that start at approximately the same x_min.
     
@@ -145,20 +145,21 @@ def group_boxes_into_columns(rec_boxes, texts, img_filename, tolerance=5, anchor
 
     print("\n[ Grouped Boxes by Columns]")
     print(sectioned_groups)
-    # Create output filename
-    base_name = os.path.splitext(os.path.basename(img_filename))[0]
-    output_filename = f"{base_name}_bounding_boxes.json"
+    if save:
+        # Create output filename
+        base_name = os.path.splitext(os.path.basename(img_filename))[0]
+        output_filename = f"{base_name}_bounding_boxes.json"
 
-    # Create output directory (../data/outputs relative to this file)
-    output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
-    os.makedirs(output_dir, exist_ok=True)
+        # Create output directory (../data/outputs relative to this file)
+        output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Full output path
-    output_path = os.path.abspath(os.path.join(output_dir, output_filename))
+        # Full output path
+        output_path = os.path.abspath(os.path.join(output_dir, output_filename))
 
-    # Save full JSON
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(sectioned_groups, f, ensure_ascii=False, indent=4)
+        # Save full JSON
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(sectioned_groups, f, ensure_ascii=False, indent=4)
 
-    print(f"Sectioned Bounding Boxes JSON saved to: {output_path}")
+        print(f"Sectioned Bounding Boxes JSON saved to: {output_path}")
     return sectioned_groups
\ No newline at end of file
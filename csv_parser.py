@@ -17,7 +17,7 @@ def load_csv_data(csv_path):
     return cleaned
 
 
-def merge_with_ocr(primary_staging_json, csv_data, original_filename):
+def merge_with_ocr(primary_staging_json, csv_data, original_filename, save=True):
     """
     Merge CSV data with OCR data (csv takes priority).
     """
@@ -41,21 +41,22 @@ def merge_with_ocr(primary_staging_json, csv_data, original_filename):
     else:
         merged_data["ocr_blocks"] = merged_data.get("ocr_blocks", [])
         
-    # Create output filename
-    base_name = os.path.splitext(os.path.basename(original_filename))[0]
-    output_filename = f"{base_name}_secondary_staging.json"
+    if save:
+        # Create output filename
+        base_name = os.path.splitext(os.path.basename(original_filename))[0]
+        output_filename = f"{base_name}_secondary_staging.json"
 
-    # Create output directory (../data/outputs relative to this file)
-    output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
-    os.makedirs(output_dir, exist_ok=True)
+        # Create output directory (../data/outputs relative to this file)
+        output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Full output path
-    output_path = os.path.abspath(os.path.join(output_dir, output_filename))
+        # Full output path
+        output_path = os.path.abspath(os.path.join(output_dir, output_filename))
 
-    # Save full JSON
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(merged_data, f, ensure_ascii=False, indent=4)
+        # Save full JSON
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(merged_data, f, ensure_ascii=False, indent=4)
 
-    print(f"Secondary JSON saved to: {output_path}")
+        print(f"Secondary JSON saved to: {output_path}")
 
     return merged_data
@@ -1,4 +1,7 @@
 import cv2
+import os
+import threading
+from PIL import Image
 
 def preprocess_image(image_path, resize_factor=2):
     # Read image
@@ -46,3 +49,118 @@ def preprocess_image(image_path, resize_factor=2):
 
     return processed_bgr
 
+
+# --- Memory-bounded (tiled) preprocessing for very large images ---
+MEMORY_BUDGET_MB = int(os.getenv("OCR_MEMORY_BUDGET_MB", 2048))
+TILE_OVERLAP = int(os.getenv("OCR_TILE_OVERLAP", 64))  # in original pixels, must exceed the tallest text line
+
+# Bytes held per upscaled pixel: resized BGR (3) + gray (1) + filtered (1) + thresh (1) + BGR copy (3)
+PREPROCESS_BYTES_PER_PIXEL = 9
+# Rough working memory of the OCR models per upscaled pixel (float32 input tensor + feature maps)
+OCR_BYTES_PER_PIXEL = 24
+MIN_TILE_SIZE = 512
+
+# Guards the temporary change of PIL's global pixel limit in get_image_size
+_pil_limit_lock = threading.Lock()
+
+class MemoryBudgetError(Exception):
+    """Raised when an image can't be processed within the memory budget, even in tiles."""
+
+def get_image_size(image_path):
+    """Returns (height, width) by reading only the image header."""
+    # Size-only probe: lift PIL's decompression bomb limit, very large images are what tiling is for
+    with _pil_limit_lock:
+        max_pixels = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None
+        try:
+            with Image.open(image_path) as im:
+                width, height = im.size
+        finally:
+            Image.MAX_IMAGE_PIXELS = max_pixels
+    return height, width
+
+def estimate_peak_bytes(height, width, resize_factor=2):
+    """Estimated peak memory to preprocess and OCR a height x width image in one go."""
+    upscaled = height * width * resize_factor * resize_factor
+    return height * width * 3 + upscaled * (PREPROCESS_BYTES_PER_PIXEL + OCR_BYTES_PER_PIXEL)
+
+def needs_tiling(image_path, resize_factor=2, memory_budget_mb=None):
+    """
+    True when processing the whole image at once would exceed the memory budget.
+    Raises MemoryBudgetError (before the image is loaded) when even tiles can't fit.
+    """
+    budget = (memory_budget_mb or MEMORY_BUDGET_MB) * 1024 * 1024
+    height, width = get_image_size(image_path)
+    if estimate_peak_bytes(height, width, resize_factor) <= budget:
+        return False
+    compute_tile_size(height, width, resize_factor, memory_budget_mb)
+    return True
+
+def compute_tile_size(height, width, resize_factor=2, memory_budget_mb=None):
+    """Largest square tile (in original pixels) whose processing fits in the budget left after loading the image."""
+    budget = (memory_budget_mb or MEMORY_BUDGET_MB) * 1024 * 1024
+    available = budget - height * width * 3
+    per_pixel = resize_factor * resize_factor * (PREPROCESS_BYTES_PER_PIXEL + OCR_BYTES_PER_PIXEL)
+    tile_size = int((max(available, 0) / per_pixel) ** 0.5)
+    if tile_size < MIN_TILE_SIZE:
+        required_mb = (height * width * 3 + MIN_TILE_SIZE * MIN_TILE_SIZE * per_pixel) // (1024 * 1024) + 1
+        raise MemoryBudgetError(
+            f"{width}x{height} image needs at least {required_mb}MB to process in tiles, "
+            f"memory budget is {budget // (1024 * 1024)}MB."
+        )
+    return tile_size
+
+def tile_positions(length, tile_size, overlap):
+    """Start offsets of overlapping tiles covering [0, length)."""
+    if length <= tile_size:
+        return [0]
+    step = tile_size - overlap
+    positions = list(range(0, length - tile_size, step))
+    positions.append(length - tile_size)  # last tile aligned with the image edge
+    return positions
+
+def global_threshold(img, max_side=1024):
+    """Otsu threshold computed once on a downscaled copy, so every tile is binarized alike."""
+    scale = min(1.0, max_side / max(img.shape[:2]))
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    gray = cv2.bilateralFilter(gray, 11, 17, 17)
+    threshold, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return threshold
+
+def preprocess_tile(tile, threshold, resize_factor=2):
+    """Same steps as preprocess_image, applied to a single tile with a fixed threshold."""
+    tile = cv2.resize(tile, None, fx=resize_factor, fy=resize_factor, interpolation=cv2.INTER_CUBIC)
+    gray = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+    del tile
+    gray = cv2.bilateralFilter(gray, 11, 17, 17)
+    _, thresh = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    del gray
+    return cv2.cvtColor(thresh, cv2.COLOR_GRAY2BGR)
+
+def iter_preprocessed_tiles(image_path, resize_factor=2, memory_budget_mb=None, overlap=None):
+    """
+    Yields (processed_tile, x_offset, y_offset, tile_width, tile_height) for overlapping tiles.
+    Offsets and sizes are in upscaled (processed image) coordinates.
+    Only the original image and one tile's intermediates are held in memory at a time.
+    """
+    overlap = TILE_OVERLAP if overlap is None else overlap
+    # Check the budget from the header before loading the full image
+    tile_size = compute_tile_size(*get_image_size(image_path), resize_factor, memory_budget_mb)
+    if tile_size <= 2 * overlap:
+        raise ValueError(f"Tile overlap {overlap}px is too large for {tile_size}px tiles.")
+
+    img = cv2.imread(image_path)
+    height, width = img.shape[:2]
+    threshold = global_threshold(img)
+
+    xs = tile_positions(width, tile_size, overlap)
+    ys = tile_positions(height, tile_size, overlap)
+    print(f"Processing {width}x{height} image as {len(xs) * len(ys)} tiles of up to {tile_size}px (overlap {overlap}px).")
+
+    for y in ys:
+        for x in xs:
+            tile = img[y:y + tile_size, x:x + tile_size]
+            th, tw = tile.shape[:2]
+            yield (preprocess_tile(tile, threshold, resize_factor),
+                   x * resize_factor, y * resize_factor, tw * resize_factor, th * resize_factor)
@@ -53,7 +53,7 @@ def construct_prompt(ocr_data, primary_staging, secondary_staging):
 
     return base_prompt
 
-def run_gemini_refinement(ocr_data, primary_staging, secondary_staging, original_filename):
+def run_gemini_refinement(ocr_data, primary_staging, secondary_staging, original_filename, save=True):
     prompt = construct_prompt(ocr_data, primary_staging, secondary_staging)
     model = genai.GenerativeModel('gemini-2.5-flash')
     response = model.generate_content(prompt)
@@ -82,7 +82,7 @@ def run_gemini_refinement(ocr_data, primary_staging, secondary_staging, original
         print("⚠️ Failed to parse Gemini output as JSON. Saving raw text.")
         final_json = {"raw_response": response.text}
 
-    if output_path:
+    if save and output_path:
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(final_json, f, indent=2)
 
@@ -5,8 +5,8 @@ from werkzeug.utils import secure_filename
 import uuid
 
 from csv_parser import load_csv_data, merge_with_ocr
-from image_processor import preprocess_image
-from ocr_extractor import extract_text
+from image_processor import preprocess_image, needs_tiling, MemoryBudgetError
+from ocr_extractor import extract_text, extract_text_tiled
 from text_processor import process_ocr_text, merge_with_boxes
 from box_bounder import group_boxes_into_columns
 from llm_refiner import run_gemini_refinement
@@ -51,11 +51,18 @@ def ocr_api():
     if not allowed_file(img_file.filename, ALLOWED_IMAGE_EXTENSIONS):
                 return jsonify({"error": f"Invalid image file format: {img_file.filename}"}), 400
 
-    # 1. Preprocess image
-    processed_img = preprocess_image(filepath)
+    # 1-2. Preprocess image and run OCR (tile by tile when the full image would exceed the memory budget)
+    try:
+        tiled = needs_tiling(filepath)
+    except MemoryBudgetError as e:
+        return jsonify({"error": str(e)}), 413
 
-    # 2. Run OCR
-    raw_ocr_data = extract_text(processed_img, img_file.filename)
+    if tiled:
+        raw_ocr_data = extract_text_tiled(filepath, img_file.filename)
+    else:
+        processed_img = preprocess_image(filepath)
+        raw_ocr_data = extract_text(processed_img, img_file.filename)
+        del processed_img
     text = "\n".join(raw_ocr_data['res']['rec_texts'])
 
     # 3. Classify Section labels (Bounding Boxes)
@@ -0,0 +1,95 @@
+import argparse
+import os
+import time
+
+from rapidfuzz import fuzz
+
+from image_processor import preprocess_image
+from ocr_extractor import OCR_BACKENDS, get_ocr_engine, run_ocr
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.webp'}
+
+def list_images(image_dir):
+    return sorted(
+        os.path.join(image_dir, f) for f in os.listdir(image_dir)
+        if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+def load_ground_truth(gt_dir, image_path):
+    """Ground truth is an optional <image_name>.txt file holding the expected label text."""
+    if not gt_dir:
+        return None
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    gt_path = os.path.join(gt_dir, f"{base_name}.txt")
+    if not os.path.exists(gt_path):
+        return None
+    with open(gt_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def benchmark(image_paths, backends, reference, gt_dir=None):
+    """
+    Runs every backend on every image and collects per-image timings and texts.
+    Accuracy is the similarity against ground truth when available, otherwise
+    against the reference backend's output.
+    Images are preprocessed one at a time (outside the timed region) to keep memory flat.
+    """
+    stats = {b: {"seconds": 0.0, "scores": []} for b in backends}
+    texts = {b: [] for b in backends}
+
+    # Load the engines and warm them up so model loading is not counted
+    warmup_img = preprocess_image(image_paths[0])
+    for backend in backends:
+        get_ocr_engine(backend)
+        run_ocr(warmup_img, backend)
+    del warmup_img
+
+    for path in image_paths:
+        img = preprocess_image(path)
+        for backend in backends:
+            start = time.perf_counter()
+            data = run_ocr(img, backend)
+            stats[backend]["seconds"] += time.perf_counter() - start
+            texts[backend].append("\n".join(data['res']['rec_texts']))
+        del img
+
+    for i, path in enumerate(image_paths):
+        expected = load_ground_truth(gt_dir, path)
+        if expected is None:
+            expected = texts[reference][i]
+        for backend in backends:
+            stats[backend]["scores"].append(fuzz.ratio(texts[backend][i], expected))
+
+    return stats
+
+def print_report(stats, n_images):
+    print(f"\n[OCR Benchmark - {n_images} images]")
+    print(f"{'backend':<12}{'total (s)':>12}{'img/s':>10}{'s/img':>10}{'accuracy':>11}")
+    for backend, s in stats.items():
+        total = s["seconds"]
+        throughput = n_images / total if total else 0.0
+        per_image = total / n_images if n_images else 0.0
+        accuracy = sum(s["scores"]) / len(s["scores"]) if s["scores"] else 0.0
+        print(f"{backend:<12}{total:>12.2f}{throughput:>10.2f}{per_image:>10.2f}{accuracy:>10.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR backends on accuracy and throughput.")
+    parser.add_argument("image_dir", help="Directory of label images")
+    parser.add_argument("--backends", nargs="+", default=list(OCR_BACKENDS), choices=list(OCR_BACKENDS))
+    parser.add_argument("--reference", default="default", choices=list(OCR_BACKENDS),
+                        help="Backend used as accuracy reference when no ground truth is given")
+    parser.add_argument("--ground-truth", help="Directory with <image_name>.txt expected texts")
+    args = parser.parse_args()
+
+    backends = list(args.backends)
+    if args.reference not in backends:
+        backends.insert(0, args.reference)
+
+    image_paths = list_images(args.image_dir)
+    if not image_paths:
+        parser.error(f"No images found in {args.image_dir}")
+
+    stats = benchmark(image_paths, backends, args.reference, args.ground_truth)
+    print_report(stats, len(image_paths))
+
+if __name__ == "__main__":
+    main()
@@ -2,45 +2,183 @@ from paddleocr import PaddleOCR
 import os
 import json
 
-ocr = PaddleOCR(
-    ocr_version="PP-OCRv5",
-    lang="en",
-    use_textline_orientation=True,
-    use_doc_orientation_classify=False,
-    use_doc_unwarping=False
-)
+from image_processor import iter_preprocessed_tiles
+from tile_merger import merge_tile_boxes
 
-def extract_text(image, original_filename):
+# --- OCR backend configuration (overridable through environment variables) ---
+# OCR_BACKEND: "default" (server PP-OCRv5, current behaviour) or "cpu" (CPU-optimised)
+DEFAULT_BACKEND = os.getenv("OCR_BACKEND", "default")
+
+def _env_flag(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _build_default_engine():
     """
-    Runs OCR on the given image and saves the full JSON result
-    to ../data/outputs/<filename>_primary_staging.json
+    PP-OCRv5 server models with textline orientation on (original pipeline).
+    Kept fixed so it stays the reference engine for ocr_benchmark.py; only the
+    thread count (OCR_CPU_THREADS, which doesn't affect accuracy) can be set.
     """
-    results = ocr.predict(image)
-    print("OCR processing completed.")
+    kwargs = dict(
+        ocr_version="PP-OCRv5",
+        lang="en",
+        use_textline_orientation=True,
+        use_doc_orientation_classify=False,
+        use_doc_unwarping=False
+    )
+    if os.getenv("OCR_CPU_THREADS"):
+        kwargs["cpu_threads"] = int(os.getenv("OCR_CPU_THREADS"))
+    return PaddleOCR(**kwargs)
+
+def _build_cpu_engine():
+    """
+    CPU-optimised engine for CPU-only hosts.
+    - OCR_CPU_THREADS: inference threads per engine (default: all cores)
+    - OCR_USE_HPI: run through the high-performance inference plugin (ONNX Runtime / OpenVINO)
+    - OCR_MOBILE_MODELS: use the lighter PP-OCRv5 mobile det/rec models (default: on)
+    - OCR_DET_MODEL_DIR / OCR_REC_MODEL_DIR: load custom (e.g. INT8-quantized) exported models;
+      a stage with a custom directory uses that model instead of the mobile one
+    - OCR_CPU_TEXTLINE_ORIENTATION: textline orientation classifier (default: off, for upright labels)
+    """
+    kwargs = dict(
+        ocr_version="PP-OCRv5",
+        lang="en",
+        device="cpu",
+        enable_mkldnn=True,
+        cpu_threads=int(os.getenv("OCR_CPU_THREADS", os.cpu_count() or 1)),
+        enable_hpi=_env_flag("OCR_USE_HPI", False),
+        use_textline_orientation=_env_flag("OCR_CPU_TEXTLINE_ORIENTATION", False),
+        use_doc_orientation_classify=False,
+        use_doc_unwarping=False
+    )
+
+    # PaddleX validates the model name against a model directory's config,
+    # so only name the mobile models for stages without a custom directory
+    use_mobile = _env_flag("OCR_MOBILE_MODELS", True)
+    det_dir = os.getenv("OCR_DET_MODEL_DIR")
+    rec_dir = os.getenv("OCR_REC_MODEL_DIR")
+    if det_dir:
+        kwargs["text_detection_model_dir"] = det_dir
+    elif use_mobile:
+        kwargs["text_detection_model_name"] = "PP-OCRv5_mobile_det"
+    if rec_dir:
+        kwargs["text_recognition_model_dir"] = rec_dir
+    elif use_mobile:
+        kwargs["text_recognition_model_name"] = "PP-OCRv5_mobile_rec"
+
+    return PaddleOCR(**kwargs)
+
+# Registered backends: name -> engine builder. Every engine must expose
+# predict(image) returning results with a .json dict holding res.rec_texts/rec_boxes.
+OCR_BACKENDS = {
+    "default": _build_default_engine,
+    "cpu": _build_cpu_engine,
+}
+
+# Engines are heavy to load, so build each backend once per process
+_engines = {}
+
+def get_ocr_engine(backend=None):
+    """Return the (cached) OCR engine for the given backend name."""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {backend} (available: {', '.join(OCR_BACKENDS)})")
+
+    if backend not in _engines:
+        _engines[backend] = OCR_BACKENDS[backend]()
+        print(f"Loaded OCR backend: {backend}")
+    return _engines[backend]
+
+def run_ocr(image, backend=None):
+    """
+    Runs OCR on the given image with the selected backend and returns
+    the structured dict output (without saving anything to disk).
+    """
+    results = get_ocr_engine(backend).predict(image)
 
+    data = None
     for res in results:
         # res.print()  # Visual debug: prints text + scores + boxes
         data = res.json  # Structured dict output
 
-        # Create output filename
-        base_name = os.path.splitext(os.path.basename(original_filename))[0]
-        output_filename = f"{base_name}_ocr_raw.json"
+    return data
+
+def save_ocr_json(data, original_filename):
+    """Saves the OCR result to ../data/outputs/<filename>_ocr_raw.json"""
+    # Create output filename
+    base_name = os.path.splitext(os.path.basename(original_filename))[0]
+    output_filename = f"{base_name}_ocr_raw.json"
+
+    # Create output directory (../data/outputs relative to this file)
+    output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Full output path
+    output_path = os.path.abspath(os.path.join(output_dir, output_filename))
+
+    # Save full JSON
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+    print(f"OCR JSON saved to: {output_path}")
+
+def extract_text(image, original_filename, backend=None):
+    """
+    Runs OCR on the given image and saves the full JSON result
+    to ../data/outputs/<filename>_ocr_raw.json
+    """
+    data = run_ocr(image, backend)
+    print("OCR processing completed.")
 
-        # Create output directory (../data/outputs relative to this file)
-        output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
-        os.makedirs(output_dir, exist_ok=True)
+    save_ocr_json(data, original_filename)
 
-        # Full output path
-        output_path = os.path.abspath(os.path.join(output_dir, output_filename))
+    # print(rec_texts)
+    # Optionally, you can also get scores:
+    # rec_scores = data.get("rec_scores", None)
 
-        # Save full JSON
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+    return data
 
-        print(f"OCR JSON saved to: {output_path}")
+# --- Tiled OCR for very large images ---
+def run_ocr_tiled(image_path, backend=None, resize_factor=2, memory_budget_mb=None, overlap=None):
+    """
+    Preprocesses and OCRs the image tile by tile so peak memory stays within the budget.
+    Returns the same {"res": {"rec_texts", "rec_boxes", "rec_scores"}} structure as run_ocr,
+    with boxes in full (upscaled) image coordinates.
+    """
+    items = []
+    tiles = iter_preprocessed_tiles(image_path, resize_factor, memory_budget_mb, overlap)
+    for tile_id, (tile, x_off, y_off, _, _) in enumerate(tiles):
+        data = run_ocr(tile, backend)
+        del tile
+        res = data['res']
+        scores = res.get('rec_scores') or [1.0] * len(res['rec_texts'])
+        for box, text, score in zip(res['rec_boxes'], res['rec_texts'], scores):
+            x_min, y_min, x_max, y_max = [int(v) for v in box]
+            items.append({
+                "box": [x_min + x_off, y_min + y_off, x_max + x_off, y_max + y_off],
+                "text": text,
+                "score": float(score),
+                "tiles": {tile_id},
+            })
 
-        # print(rec_texts)
-        # Optionally, you can also get scores:
-        # rec_scores = data.get("rec_scores", None)
+    merged = merge_tile_boxes(items)
+    print(f"Tiled OCR completed: {len(items)} tile boxes merged into {len(merged)}.")
+    return {
+        "res": {
+            "input_path": image_path,
+            "rec_texts": [it["text"] for it in merged],
+            "rec_boxes": [it["box"] for it in merged],
+            "rec_scores": [it["score"] for it in merged],
+        }
+    }
 
+def extract_text_tiled(image_path, original_filename, backend=None, memory_budget_mb=None):
+    """
+    Tiled counterpart of extract_text for very large images: takes the image path
+    (tiles are preprocessed on the fly) and saves the merged JSON result.
+    """
+    data = run_ocr_tiled(image_path, backend, memory_budget_mb=memory_budget_mb)
+    save_ocr_json(data, original_filename)
     return data
@@ -0,0 +1,92 @@
+from tile_merger import _join_seam_text, merge_tile_boxes
+
+def box_item(box, text, tile, score=0.9):
+    return {"box": box, "text": text, "score": score, "tiles": {tile}}
+
+def texts(merged):
+    return [it["text"] for it in merged]
+
+# --- Seam-split lines ---
+def test_line_split_by_vertical_seam_is_joined():
+    merged = merge_tile_boxes([
+        box_item([0, 100, 500, 130], "INGREDIENTS: SUGAR, W", 0),
+        box_item([440, 100, 900, 130], "R, WHEAT FLOUR", 1),
+    ])
+    assert texts(merged) == ["INGREDIENTS: SUGAR, WHEAT FLOUR"]
+    assert merged[0]["box"] == [0, 100, 900, 130]
+    assert merged[0]["tiles"] == {0, 1}
+
+def test_short_tail_past_seam_is_joined_not_dropped():
+    merged = merge_tile_boxes([
+        box_item([700, 100, 1000, 140], "Net Weight 5", 0),
+        box_item([872, 100, 1050, 140], "ight 500g", 1),
+    ])
+    assert texts(merged) == ["Net Weight 500g"]
+    assert merged[0]["box"] == [700, 100, 1050, 140]
+
+def test_join_seam_text_exact_overlap():
+    left = box_item([0, 0, 300, 40], "Net Weight 5", 0)
+    right = box_item([172, 0, 350, 40], "ight 500g", 1)
+    assert _join_seam_text(left, right) == "Net Weight 500g"
+
+def test_join_seam_text_aligns_fuzzily_when_ocr_differs():
+    # The overlap is read as "BEFORE 12/0" by one tile and "BEF0RE 12/0" by the other
+    left = box_item([0, 0, 400, 40], "BEST BEFORE 12/0", 0)
+    right = box_item([150, 0, 600, 40], "BEF0RE 12/05/2026", 1)
+    assert _join_seam_text(left, right) == "BEST BEFORE 12/05/2026"
+
+def test_join_seam_text_keeps_longer_piece_when_no_alignment():
+    left = box_item([0, 0, 400, 40], "BEST BEFORE", 0)
+    right = box_item([300, 0, 500, 40], "XQZ", 1)
+    assert _join_seam_text(left, right) == "BEST BEFORE"
+
+# --- True duplicates ---
+def test_same_text_seen_by_two_tiles_is_kept_once():
+    merged = merge_tile_boxes([
+        box_item([450, 10, 560, 40], "NET WT", 0, score=0.8),
+        box_item([450, 10, 560, 40], "NET WT", 1, score=0.95),
+    ])
+    assert len(merged) == 1
+    assert merged[0]["score"] == 0.95
+    assert merged[0]["tiles"] == {0, 1}
+
+def test_cut_copy_inside_complete_box_keeps_complete_one():
+    merged = merge_tile_boxes([
+        box_item([480, 200, 560, 230], "T 500g", 0),
+        box_item([450, 200, 562, 230], "NET 500g", 1),
+    ])
+    assert texts(merged) == ["NET 500g"]
+
+def test_copy_of_touching_neighbour_is_not_joined_onto_it():
+    # PaddleOCR's unclip padding makes neighbouring words on one line touch
+    merged = merge_tile_boxes([
+        box_item([0, 100, 205, 130], "NET", 0),
+        box_item([200, 100, 400, 130], "WT 500g", 0),
+        box_item([198, 100, 400, 130], "WT 500g", 1),
+    ])
+    assert texts(merged) == ["NET", "WT 500g"]
+
+# --- Horizontal-seam cuts ---
+def test_line_cut_by_horizontal_seam_keeps_full_height_box():
+    merged = merge_tile_boxes([
+        box_item([100, 300, 600, 318], "MRP Rs 120", 0, score=0.99),  # top half only
+        box_item([100, 300, 600, 340], "MRP Rs 120.00", 2, score=0.9),
+    ])
+    assert texts(merged) == ["MRP Rs 120.00"]
+    assert merged[0]["box"] == [100, 300, 600, 340]
+
+# --- Unrelated boxes ---
+def test_boxes_from_the_same_tile_are_never_merged():
+    merged = merge_tile_boxes([
+        box_item([0, 0, 100, 30], "A", 0),
+        box_item([50, 0, 150, 30], "B", 0),
+    ])
+    assert texts(merged) == ["A", "B"]
+
+def test_result_is_in_reading_order():
+    merged = merge_tile_boxes([
+        box_item([400, 52, 500, 80], "right", 1),
+        box_item([0, 50, 100, 80], "left", 0),
+        box_item([0, 0, 100, 30], "top", 0),
+    ])
+    assert texts(merged) == ["top", "left", "right"]
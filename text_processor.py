@@ -27,7 +27,7 @@ FIELDS = [
     "UNSPSC", "Date of Manufacturing", "Expiry Date"
 ]
 
-def process_ocr_text(raw_text, original_filename):
+def process_ocr_text(raw_text, original_filename, save=True):
     extracted_data = {field: None for field in FIELDS}
 
     # ------------------ Step 1: Basic Cleaning ------------------
@@ -59,22 +59,23 @@ def process_ocr_text(raw_text, original_filename):
     print("\n[Step 2 - Spell Corrected Text]")
     # print(text)
 
-    # Create output filename
-    base_name = os.path.splitext(os.path.basename(original_filename))[0]
-    output_filename = f"{base_name}_primary_cleaned.json"
+    if save:
+        # Create output filename
+        base_name = os.path.splitext(os.path.basename(original_filename))[0]
+        output_filename = f"{base_name}_primary_cleaned.json"
 
-    # Create output directory (../data/outputs relative to this file)
-    output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
-    os.makedirs(output_dir, exist_ok=True)
+        # Create output directory (../data/outputs relative to this file)
+        output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Full output path
-    output_path = os.path.abspath(os.path.join(output_dir, output_filename))
+        # Full output path
+        output_path = os.path.abspath(os.path.join(output_dir, output_filename))
 
-    # Save full JSON
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(extracted_data, f, ensure_ascii=False, indent=4)
+        # Save full JSON
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(extracted_data, f, ensure_ascii=False, indent=4)
 
-    print(f"Primary Cleaned JSON saved to: {output_path}")
+        print(f"Primary Cleaned JSON saved to: {output_path}")
 
 
     # ------------------ Step 3: Field-Specific Regex Extraction ------------------
@@ -171,7 +172,7 @@ def process_ocr_text(raw_text, original_filename):
 
     return extracted_data
 
-def merge_with_boxes(ocr_data, box_data, original_filename):
+def merge_with_boxes(ocr_data, box_data, original_filename, save=True):
     """
     Merge OCR data with CSV data based on the fields.
     - Keeps all fields from ocr_data (structured JSON).
@@ -199,21 +200,22 @@ def merge_with_boxes(ocr_data, box_data, original_filename):
 
             merged_data[field] = " ".join(collected_texts).strip()
 
-    # Create output filename
-    base_name = os.path.splitext(os.path.basename(original_filename))[0]
-    output_filename = f"{base_name}_primary_staging.json"
+    if save:
+        # Create output filename
+        base_name = os.path.splitext(os.path.basename(original_filename))[0]
+        output_filename = f"{base_name}_primary_staging.json"
 
-    # Create output directory (../data/outputs relative to this file)
-    output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
-    os.makedirs(output_dir, exist_ok=True)
+        # Create output directory (../data/outputs relative to this file)
+        output_dir = os.path.join(os.path.dirname(__file__), "..", "data", "outputs")
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Full output path
-    output_path = os.path.abspath(os.path.join(output_dir, output_filename))
+        # Full output path
+        output_path = os.path.abspath(os.path.join(output_dir, output_filename))
 
-    # Save merged JSON
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(merged_data, f, ensure_ascii=False, indent=4)
+        # Save merged JSON
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(merged_data, f, ensure_ascii=False, indent=4)
 
-    print(f"Primary Staging JSON saved to: {output_path}")
+        print(f"Primary Staging JSON saved to: {output_path}")
 
     return merged_data
@@ -0,0 +1,121 @@
+# Merging of OCR boxes from overlapping image tiles (see ocr_extractor.run_ocr_tiled)
+from rapidfuzz import fuzz
+
+CONTAINMENT_SLACK = 0.5   # fraction of the line height the union may extend past the larger box and still be the same text
+SAME_LINE_OVERLAP = 0.5   # vertical IoU above which two boxes sit on the same text line
+LINE_SORT_TOLERANCE = 10  # px, boxes whose tops differ less than this are on the same line (as in PaddleOCR)
+SEAM_MIN_ALIGN_CHARS = 3  # shortest repeated text fuzzily aligned across a seam
+SEAM_ALIGN_SCORE = 80     # rapidfuzz ratio needed to accept a fuzzy seam alignment
+
+def _area(box):
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+def _intersection(a, b):
+    return max(0, min(a[2], b[2]) - max(a[0], b[0])) * max(0, min(a[3], b[3]) - max(a[1], b[1]))
+
+def _vertical_iou(a, b):
+    inter = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    union = max(a[3], b[3]) - min(a[1], b[1])
+    return inter / union if union else 0.0
+
+def _line_slack(a, b):
+    # Tolerance in px, relative to the text height: boxes touching by less are just neighbours
+    return CONTAINMENT_SLACK * min(a[3] - a[1], b[3] - b[1])
+
+def _is_duplicate(a, b):
+    """
+    Two boxes from different tiles are the same text when one (nearly) contains the
+    other, i.e. their union is not meaningfully larger than the larger box.
+    """
+    larger = a if _area(a) >= _area(b) else b
+    slack = _line_slack(a, b)
+    union_w = max(a[2], b[2]) - min(a[0], b[0])
+    union_h = max(a[3], b[3]) - min(a[1], b[1])
+    return union_w - (larger[2] - larger[0]) <= slack and union_h - (larger[3] - larger[1]) <= slack
+
+def _join_seam_text(left, right):
+    """
+    Joins two pieces of one text line cut at a tile seam. Both pieces contain the
+    text under the overlap, so drop the repeated part from the right piece.
+    """
+    lt, rt = left["text"], right["text"]
+    for k in range(min(len(lt), len(rt)), 1, -1):
+        if lt.endswith(rt[:k]):
+            return lt + rt[k:]
+
+    # No exact match (OCR read the overlap slightly differently) - align it fuzzily
+    best_k, best_score = 0, 0
+    for k in range(SEAM_MIN_ALIGN_CHARS, min(len(lt), len(rt)) + 1):
+        score = fuzz.ratio(lt[-k:], rt[:k])
+        if score >= best_score:
+            best_k, best_score = k, score
+    if best_score >= SEAM_ALIGN_SCORE:
+        return lt + rt[best_k:]
+
+    # Can't tell where the pieces meet: keep the more complete one rather than guess
+    return lt if len(lt) >= len(rt) else rt
+
+def _remove_duplicates(items):
+    """Keeps one box per text seen by several tiles: the larger (uncut) one, then the more confident one."""
+    kept = []
+    for item in items:
+        for i, other in enumerate(kept):
+            if item["tiles"] <= other["tiles"]:
+                continue  # boxes from the same tile never cover the same text
+            a, b = other["box"], item["box"]
+            if not _intersection(a, b) or not _is_duplicate(a, b):
+                continue
+            if (_area(b), item["score"]) > (_area(a), other["score"]):
+                kept[i] = dict(item, tiles=other["tiles"] | item["tiles"])
+            else:
+                other["tiles"] |= item["tiles"]
+            break
+        else:
+            kept.append(item)
+    return kept
+
+def _join_seam_pieces(items):
+    """Joins pieces of one line cut by a vertical seam, which overlap by more than padding."""
+    joined = []
+    for item in items:
+        for i, other in enumerate(joined):
+            if other["tiles"] & item["tiles"]:
+                continue  # pieces of one line come from different tiles
+            a, b = other["box"], item["box"]
+            overlap_px = min(a[2], b[2]) - max(a[0], b[0])
+            if overlap_px <= _line_slack(a, b) or _vertical_iou(a, b) < SAME_LINE_OVERLAP:
+                continue
+            left, right = (other, item) if a[0] <= b[0] else (item, other)
+            joined[i] = {
+                "box": [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])],
+                "text": _join_seam_text(left, right),
+                "score": min(other["score"], item["score"]),
+                "tiles": other["tiles"] | item["tiles"],
+            }
+            break
+        else:
+            joined.append(item)
+    return joined
+
+def merge_tile_boxes(items):
+    """
+    Merges OCR boxes from overlapping tiles into one list.
+    items: dicts with box [x_min, y_min, x_max, y_max] (full-image coordinates), text, score, tiles (set of tile ids)
+    - Boxes from different tiles covering the same text keep only the more complete one.
+    - Pieces of one line cut by a vertical seam (each reaching past the other) are then joined into a single box.
+    Duplicates are removed first, so a copy of a box can't be joined onto its neighbour.
+    """
+    items = sorted((dict(it, tiles=set(it["tiles"])) for it in items),
+                   key=lambda it: (it["box"][1], it["box"][0]))
+    merged = _join_seam_pieces(_remove_duplicates(items))
+
+    # Reading order: top to bottom, left to right within a line
+    merged.sort(key=lambda it: (it["box"][1], it["box"][0]))
+    for i in range(len(merged) - 1):
+        for j in range(i, -1, -1):
+            a, b = merged[j]["box"], merged[j + 1]["box"]
+            if abs(b[1] - a[1]) < LINE_SORT_TOLERANCE and b[0] < a[0]:
+                merged[j], merged[j + 1] = merged[j + 1], merged[j]
+            else:
+                break
+    return merged